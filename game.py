@@ -98,12 +98,17 @@ LEFT OFF HERE
 
 import sys
 import atexit
+import logging
 from pathlib import Path
 from dataclasses import dataclass
 import random
 import json
+import math
 import os
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"          # Set pygame env var to hide "Hello" msg
+# SDL env vars only take effect if they are set before pygame.init()
+os.environ["PYGAME_BLEND_ALPHA_SDL2"] = "1"             # Use SDL2 alpha blending
+# os.environ["SDL_VIDEO_WINDOW_POS"] = "1000,0"           # Position window in upper right
 import pygame
 from pygame import Color
 from libs.utils import setup_logging, load_image, OsWindow, Text, HelpHud, DebugHud, define_surfaces, define_actions, define_moves, define_held_keys, define_colors, define_settings, floor, ceiling, add, subtract, modulo
@@ -150,6 +155,11 @@ class Player:
         self.wiggle = 0.1                               # Amount to randomize each coordinate value
         self.moving = False                             # Track moving or not moving
         self.moves = define_moves()                     # Dict of player movements
+        self.directions = (                             # (direction, discrete move, free move) in update order
+                ('down',  'move_down_to_tile',  'move_down'),
+                ('up',    'move_up_to_tile',    'move_up'),
+                ('left',  'move_left_to_tile',  'move_left'),
+                ('right', 'move_right_to_tile', 'move_right'))
         # TODO: sign of z-direction always confuses me, e.g., look at self.z in render_romanized_chars
         self.z = 0                                      # Position in z-direction
         self.zclimbmax = 3.5                            # Max amt player can climb -- determines max height of steps
@@ -170,29 +180,17 @@ class Player:
         if self.game.debug_hud:
             self.game.debug_hud.add_text(f"self.moves: {self.moves}")
 
+        moves = self.moves
         # Track moving or not moving for animation purposes
-        if self.moves['move_down'] or self.moves['move_up'] or self.moves['move_left'] or self.moves['move_right']:
-            self.moving = True
-        else:
-            self.moving = False
+        self.moving = bool(moves['move_down'] or moves['move_up'] or moves['move_left'] or moves['move_right'])
 
         if 1:
-            if self.moves['move_down_to_tile'] or self.moves['move_down']:
-                self.update_movement_state()
-                self.update_movement_pos('down')
-                self.handle_collision('down')
-            if self.moves['move_up_to_tile'] or self.moves['move_up']:
-                self.update_movement_state()
-                self.update_movement_pos('up')
-                self.handle_collision('up')
-            if self.moves['move_left_to_tile'] or self.moves['move_left']:
-                self.update_movement_state()
-                self.update_movement_pos('left')
-                self.handle_collision('left')
-            if self.moves['move_right_to_tile'] or self.moves['move_right']:
-                self.update_movement_state()
-                self.update_movement_pos('right')
-                self.handle_collision('right')
+            # Same three steps for each direction
+            for direction, move_to_tile, move in self.directions:
+                if moves[move_to_tile] or moves[move]:
+                    self.update_movement_state()
+                    self.update_movement_pos(direction)
+                    self.handle_collision(direction)
         else:
             self.update_movement_discrete()
             self.update_movement_free()
@@ -506,12 +504,9 @@ class Player:
         # G = (int(self.pos[0]), int(self.pos[1])) # No, don't just integer truncate
         # If partway between voxels, use whichever voxel player is closer to
         G = (round(self.pos[0]), round(self.pos[1]))
-        tiles = self.game.tile_map.layout
-        voxels = self.game.voxel_artwork.layout
-        if G in tiles:
-            self.voxel = voxels[G]
-        else:
-            self.voxel = None # Nothing under the player
+        # Voxels are keyed by grid point, so the layout is already a spatial
+        # hash with 1x1 cells: one lookup, None if nothing is under the player
+        self.voxel = self.game.voxel_artwork.layout.get(G)
 
     def render(self, surf:pygame.Surface) -> None:
         """Display the player."""
@@ -521,15 +516,23 @@ class Player:
         else:
             # Wiggle less if standing still
             self.wiggle = 0.2
+        # Look these up once for the whole render
+        grid = self.game.grid
+        xfm_gp_points = grid.xfm_gp_points
+        scale = grid.scale
+        colors = self.game.colors
         G = self.pos
         percentage = 0.5                                # Player fills half the tile
         p = 1-percentage
         d = p/2
+        # Wiggle each point by up to +/- w
+        w = self.wiggle*d
+        uniform = random.uniform
         Gs = [ # Define a polygon on the grid
-              (G[0] + d     + random.uniform(-1*self.wiggle*d, self.wiggle*d), G[1] + d    + random.uniform(-1*self.wiggle*d, self.wiggle*d)),
-              (G[0] + 1 - d + random.uniform(-1*self.wiggle*d, self.wiggle*d), G[1] + d    + random.uniform(-1*self.wiggle*d, self.wiggle*d)),
-              (G[0] + 1 - d + random.uniform(-1*self.wiggle*d, self.wiggle*d), G[1] + 1 -d + random.uniform(-1*self.wiggle*d, self.wiggle*d)),
-              (G[0] + d     + random.uniform(-1*self.wiggle*d, self.wiggle*d), G[1] + 1 -d + random.uniform(-1*self.wiggle*d, self.wiggle*d))]
+              (G[0] + d     + uniform(-w, w), G[1] + d    + uniform(-w, w)),
+              (G[0] + 1 - d + uniform(-w, w), G[1] + d    + uniform(-w, w)),
+              (G[0] + 1 - d + uniform(-w, w), G[1] + 1 -d + uniform(-w, w)),
+              (G[0] + d     + uniform(-w, w), G[1] + 1 -d + uniform(-w, w))]
         # Draw player shadow -- QUICK AND DIRTY LIGHTING -- this shadow effect is terrible
         # TEMPORARY: assume shadow is on floor at z=0
         # Check actual z-value of what is below player and set 'floor_height' to that
@@ -537,7 +540,7 @@ class Player:
         if self.voxel != None:
             tile_height = self.voxel['height']
             tile_z = self.voxel['z']
-            floor_height = -1*(tile_z + tile_height)*self.game.grid.scale
+            floor_height = -1*(tile_z + tile_height)*scale
         ### Grow light shadow proportional to height above floor_height
         k = 0.005*(floor_height - self.z)
         shadow_light_points_g = [
@@ -564,7 +567,7 @@ class Player:
         ### Shrink dark shadow proportional to height above floor_height
         # Center of tile
         # TODO: if moving, push center (player head) in direction of motion
-        Gc =  (G[0] + 0.5   + random.uniform(-1*self.wiggle*d, self.wiggle*d), G[1] + 0.5  + random.uniform(-1*self.wiggle*d, self.wiggle*d))
+        Gc =  (G[0] + 0.5   + uniform(-w, w), G[1] + 0.5  + uniform(-w, w))
         # k = min(0.5,0.005*(abs(floor_height - self.z)))
         k = min(0.25, abs(0.5 - 0.005*(floor_height - self.z)))
         shadow_dark_points_g = [
@@ -573,33 +576,30 @@ class Player:
                 (Gc[0] + k, Gc[1] + k),
                 (Gc[0] - k, Gc[1] + k)]
         # Convert to pixel coordinates
-        points = [self.game.grid.xfm_gp(G) for G in Gs]
-        Pc = self.game.grid.xfm_gp(Gc)
-        shadow_light_points_p_z0 = [self.game.grid.xfm_gp(G) for G in shadow_light_points_g]
-        shadow_dark_points_p_z0 = [self.game.grid.xfm_gp(G) for G in shadow_dark_points_g]
         # Bring the shadow up to the floor height
-        shadow_light_points_p = [(P[0],P[1]+floor_height) for P in shadow_light_points_p_z0]
-        shadow_dark_points_p  = [(P[0],P[1]+floor_height) for P in shadow_dark_points_p_z0]
-        pygame.draw.polygon(surf, self.game.colors['color_floor_shadow_light'], shadow_light_points_p)
-        pygame.draw.polygon(surf, self.game.colors['color_floor_shadow'], shadow_dark_points_p)
+        Ps = xfm_gp_points(shadow_light_points_g + shadow_dark_points_g, dy=floor_height)
+        shadow_light_points_p = Ps[0:4]
+        shadow_dark_points_p  = Ps[4:8]
+        pygame.draw.polygon(surf, colors['color_floor_shadow_light'], shadow_light_points_p)
+        pygame.draw.polygon(surf, colors['color_floor_shadow'], shadow_dark_points_p)
         # Incorporate player height:
-        points = [(p[0],p[1] + self.z) for p in points]
-        Pc = (Pc[0], Pc[1] + self.z)
+        Ps = xfm_gp_points(Gs + [Gc], dy=self.z)
+        points = Ps[0:4]
+        Pc = Ps[4]
         # Elevate that center point
-        center = (Pc[0], Pc[1] - self.height*self.game.grid.scale)
+        center = (Pc[0], Pc[1] - self.height*scale)
         # Draw player dress
         ### polygon(surface, color, points) -> Rect
-        color = Color(self.game.colors['color_grid_y_axis'])
-        pygame.draw.polygon(surf, color, [points[1],points[2],center])
-        color.r -= 50; color.g -=50; color.b -= 50
-        pygame.draw.polygon(surf, color, [points[0],points[1],center])
+        pygame.draw.polygon(surf, colors['color_player_dress'], [points[1],points[2],center])
+        pygame.draw.polygon(surf, colors['color_player_dress_dark'], [points[0],points[1],center])
         # Draw sketchy lines around player
         ### line(surface, color, start_pos, end_pos) -> Rect
+        color_lines = colors['color_grid_y_axis']
         for p in points:
-            pygame.draw.line(surf, self.game.colors['color_grid_y_axis'], p, center, width=2)
+            pygame.draw.line(surf, color_lines, p, center, width=2)
         # Draw player head
         ### circle(surface, color, center, radius, width=0, draw_top_right=None, draw_top_left=None, draw_bottom_left=None, draw_bottom_right=None) -> Rect
-        pygame.draw.circle(surf, Color(0,0,0), center, 2*self.game.grid.scale)
+        pygame.draw.circle(surf, Color(0,0,0), center, 2*scale)
 
     def render_romanized_chars(self, surf:pygame.Surface) -> None:
         """Render romanized chars above the player's head.
@@ -650,6 +650,7 @@ class TileMap:
     b:int -- lower left of layout is grid coordinate (b,b)
     layout:dict --  keys are the grid coordinate of the lower-left of the grid tile
                     values are a dict describing the tile
+    draw_order:list -- grid coordinates in back-to-front draw order
 
     Old attributes
     walls:list -- list of walls, each wall is a list of voxels, each voxel has a pos, height, and style
@@ -659,6 +660,14 @@ class TileMap:
         self.a = -1*int(self.N/2)
         self.b = int(self.N/2)
 
+        # Make a back-to-front draw order (see VoxelArtwork.render())
+        # The grid does not change, so this is only done once.
+        self.draw_order = [(i,j) for j in range(self.b,self.a-1,-1) for i in range(self.a,self.b)]
+        ### [(-25,  25), (-24,  25), ... (0,  25), ... (24,  25),
+        ###  (-25,  24), (-24,  24), ... (0,  24), ... (24,  24),
+        ###  ...
+        ###  (-25, -25), (-24, -25), ... (0, -25), ... (24, -25)]
+
         # Make a layout of walls
         a = self.a
         b = self.b
@@ -718,17 +727,7 @@ class TileMap:
                 step_height += 3
                 layout[(self.a+1,i)] = {'z':0, 'percentage':1, 'height':step_height, 'style':"style_shade_faces_solid_color", 'rand_amt':0}
             # Fill the rest of the layout with floor tiles
-            grid_list = [] # Walk grid coordinates
-            a = self.a; b = self.b
-            for j in range(b,a-1,-1): # See VoxelArtwork.render()
-                for i in range(a,b):
-                    G = (i,j)
-                    grid_list.append(G)
-            ### [(-25,  25), (-24,  25), ... (0,  25), ... (24,  25),
-            ###  (-25,  24), (-24,  24), ... (0,  24), ... (24,  24),
-            ###  ...
-            ###  (-25, -25), (-24, -25), ... (0, -25), ... (24, -25)]
-            for G in grid_list:
+            for G in self.draw_order:
                 if G in layout:
                     pass # Don't need a floor tile here yet because I am doing just one voxel per tile for now
                 else:
@@ -749,6 +748,9 @@ class VoxelArtwork:
         self.game = game
         self.N = self.game.grid.N
         self._percentage = percentage
+        # Voxel quads in pixel space: rebuilt when the xfm, surface size, or layout changes
+        self._pixel_cache = None
+        self._pixel_cache_key = None
         # TODO: Move this out to a level editor later
         # Make a layout of voxels in grid space
         # self.layout = self.make_random_layout()
@@ -760,6 +762,36 @@ class VoxelArtwork:
     @percentage.setter
     def percentage(self, value:float):
         self._percentage = value
+        self._pixel_cache = None
+
+    @property
+    def layout(self) -> dict:
+        return self._layout
+    @layout.setter
+    def layout(self, value:dict):
+        self._layout = value
+        self._pixel_cache = None
+        # Position of each voxel in the draw order (for draw_index_in_front_of())
+        voxels_in_order = (G for G in self.game.tile_map.draw_order if G in value)
+        self.draw_index = {G:n for n,G in enumerate(voxels_in_order)}
+
+    def draw_index_in_front_of(self, G:tuple) -> int:
+        """Return the voxel_index after which something at grid point G is drawn.
+
+        That is one past the last voxel (in draw order) that is behind G:
+        the last voxel V with V[0] <= G[0] and V[1] >= G[1]. Rows are drawn
+        back-to-front (y descending) and left-to-right, so the last such voxel
+        is the nearest one walking up from row G[1], then left from column
+        G[0]. Returns 0 if nothing is behind G.
+        """
+        draw_index = self.draw_index
+        a = self.game.tile_map.a
+        b = self.game.tile_map.b
+        for j in range(max(G[1],a), b+1):
+            for i in range(min(G[0],b-1), a-1, -1):
+                if (i,j) in draw_index:
+                    return draw_index[(i,j)] + 1
+        return 0
 
     def make_random_layout(self) -> list:
         """Return a list of random voxels ready for rendering.
@@ -774,11 +806,7 @@ class VoxelArtwork:
         for j in range(b,a,-1):
             for i in range(a,b):
                 G = (i,j)
-                height = random.choice(list(range(1,20)))
-                # grid_points = [[G[0]   + d,G[1]   + d],
-                #                [G[0]+1 - d,G[1]   + d],
-                #                [G[0]+1 - d,G[1]+1 - d],
-                #                [G[0]   + d,G[1]+1 - d]]
+                height = random.randint(1,19)
                 grid_points = [(G[0]  ,G[1]  ),
                                (G[0]+1,G[1]  ),
                                (G[0]+1,G[1]+1),
@@ -799,7 +827,7 @@ class VoxelArtwork:
             wall = self.game.tile_map.layout[G]
             height = wall['height']
             if wall['rand_amt'] > 0:
-                height = random.choice(list(range(wall['height'],wall['height']+wall['rand_amt'])))
+                height = random.randrange(wall['height'], wall['height']+wall['rand_amt'])
             grid_points = [(G[0]  ,G[1]  ),
                            (G[0]+1,G[1]  ),
                            (G[0]+1,G[1]+1),
@@ -882,6 +910,55 @@ class VoxelArtwork:
             adjusted_voxel_artwork[G] = {'z':z, 'grid_points':adjusted_grid_points,'height':height,'style':style}
         return adjusted_voxel_artwork
 
+    def pixel_cache(self, size:tuple) -> dict:
+        """Return the pixel quads of every voxel on the surface, keyed by grid point.
+
+        :param size:tuple -- (W,H) of the surface; voxels entirely off the surface are culled
+
+        Each value is (Ps, voxel_Ts, voxel_Ls, voxel_Rs, style):
+        Ps -- bottom quad, voxel_Ts/Ls/Rs -- top/left/right quads.
+        None of this changes from frame to frame, so it is only calculated
+        again after the xfm (pan, zoom, a..f), the surface size, the layout,
+        or the percentage changes.
+        """
+        grid = self.game.grid
+        key = (grid.xfm, grid.scale, size)
+        if (self._pixel_cache is not None) and (self._pixel_cache_key == key):
+            return self._pixel_cache
+        A,B,C,D,E,F = grid.xfm
+        scale = grid.scale
+        W,H = size
+        cache = {}
+        for G,voxel in self.layout.items():
+            # Shrink the tile by the voxel's percentage, keeping it centered (same as adjust_voxel_size)
+            d = (1 - voxel['percentage'])/2
+            x0 = G[0] + d; x1 = G[0] + 1 - d
+            y0 = G[1] + d; y1 = G[1] + 1 - d
+            # Xfm the four corners (clockwise from lower left) and raise them by z
+            # Store whole pixels (ints) so the draw calls do not convert floats
+            f = F - voxel['z']*scale
+            px0 = round(A*x0 + B*y0 + E); py0 = round(C*x0 + D*y0 + f)
+            px1 = round(A*x1 + B*y0 + E); py1 = round(C*x1 + D*y0 + f)
+            px2 = round(A*x1 + B*y1 + E); py2 = round(C*x1 + D*y1 + f)
+            px3 = round(A*x0 + B*y1 + E); py3 = round(C*x0 + D*y1 + f)
+            # Snap the height to whole pixels too, so every top is the same shape as its bottom
+            height = round(voxel['height']*scale)
+            # Cull the voxel if its bounding box is off the surface
+            # (the top is the bottom raised by height >= 0; 2 pixel margin for the width=3 outlines)
+            if ((max(px0,px1,px2,px3) < -2) or (min(px0,px1,px2,px3) > W + 2) or
+                (max(py0,py1,py2,py3) < -2) or (min(py0,py1,py2,py3) - height > H + 2)):
+                continue
+            # Describe the three visible surfaces of the voxel as quads
+            ### T: Top, L: Left, R: Right
+            Ps = [(px0,py0), (px1,py1), (px2,py2), (px3,py3)]
+            voxel_Ts = [(px0,py0 - height), (px1,py1 - height), (px2,py2 - height), (px3,py3 - height)]
+            voxel_Ls = [Ps[0], Ps[1], voxel_Ts[1], voxel_Ts[0]]
+            voxel_Rs = [Ps[1], Ps[2], voxel_Ts[2], voxel_Ts[1]]
+            cache[G] = (Ps, voxel_Ts, voxel_Ls, voxel_Rs, voxel['style'])
+        self._pixel_cache = cache
+        self._pixel_cache_key = key
+        return cache
+
     def old_adjust_voxel_size(self) -> list:
         """Scale size of each voxel by some percentage."""
         adjusted_voxel_artwork = []
@@ -905,7 +982,9 @@ class VoxelArtwork:
 
     def render(self, surf) -> None:
         """Render voxels, player, and mouse."""
-        voxels = self.adjust_voxel_size()
+        voxels = self.layout
+        # Pixel quads of the voxels on the surface (off-surface voxels are culled, see pixel_cache)
+        visible = self.pixel_cache(surf.get_size())
         player = self.game.player
         player_is_rendered = False
         mouse_is_rendered = False
@@ -915,22 +994,11 @@ class VoxelArtwork:
         #   Say the player is at voxel_index 0 or 1 or whatever.
         #   Then the player will be drawn over and over and over again until that first voxel is finally drawn.
         #   This tanks the framerate! And it superimposes many images of the player onto the same frame.
-        mouse = self.game.grid.xfm_pg(pygame.mouse.get_pos())
+        mouse = self.game.mouses['mouse_pos_g']
 
         ### voxels[G] = {'grid_points':grid_points, 'height':height, 'style':wall['style']}
-        # Make a back-to-front draw order
-        a = self.game.tile_map.a # -25
-        b = self.game.tile_map.b # +25
-        grid_list = [] # Walk grid coordinates in the order listed here
-        for j in range(b,a-1,-1):
-            for i in range(a,b):
-                G = (i,j)
-                grid_list.append(G)
-        # logger.debug(grid_list)
-        ### [(-25,  25), (-24,  25), ... (0,  25), ... (24,  25),
-        ###  (-25,  24), (-24,  24), ... (0,  24), ... (24,  24),
-        ###  ...
-        ###  (-25, -25), (-24, -25), ... (0, -25), ... (24, -25)]
+        # Walk grid coordinates in back-to-front draw order (cached in TileMap)
+        grid_list = self.game.tile_map.draw_order
 
         # TODO: come back to this idea -- maybe I run this for everything to store a draw order with every voxel and object.
         # Figure out when to draw the player
@@ -942,71 +1010,68 @@ class VoxelArtwork:
         #             player_draw_index = i + 1
 
         # Figure out when to draw the player and mouse
-        player_draw_index = 0; mouse_draw_index = 0; voxel_index=0
-        for G in grid_list:
-            if G in voxels:
-                # if (player.pos[0] >= G[0]) and (player.pos[1] <= G[1]): # NO!
-                # 'round(player.pos[n])' -- THIS FIXES THE ARTIFACT WHERE PLAYER IS HIDDEN BEHIND A VOXEL
-                if (round(player.pos[0]) >= G[0]) and (round(player.pos[1]) <= G[1]):
-                    # Player is in front of this voxel; update draw order
-                    player_draw_index = voxel_index + 1
-                if (mouse[0] >= G[0]) and (mouse[1] <= G[1]):
-                    mouse_draw_index = voxel_index + 1
-                # Increment voxel index at the end of the loop (not the beginning)!
-                #   THIS FIXES YET ANOTHER ARTIFACT WHERE PLAYER IS BEHIND A VOXEL
-                voxel_index += 1
+        # 'round(player.pos[n])' -- THIS FIXES THE ARTIFACT WHERE PLAYER IS HIDDEN BEHIND A VOXEL
+        player_draw_index = self.draw_index_in_front_of((round(player.pos[0]), round(player.pos[1])))
+        mouse_draw_index = self.draw_index_in_front_of(mouse)
 
         ### Draw voxels!
+        draw_polygon = pygame.draw.polygon              # Bind the draw functions once for the voxel loop
+        draw_line = pygame.draw.line
+        # Look up the colors once, not once per voxel
+        colors = self.game.colors
+        color_voxel_top_floor = colors['color_voxel_top_floor']
+        color_voxel_left_floor = colors['color_voxel_left_floor']
+        color_voxel_right_floor = colors['color_voxel_right_floor']
+        color_voxel_top = colors['color_voxel_top']
+        color_voxel_left = colors['color_voxel_left']
+        color_voxel_left_shadow = colors['color_voxel_left_shadow']
+        color_voxel_right = colors['color_voxel_right']
+        color_voxel_right_shadow = colors['color_voxel_right_shadow']
+        color_mouse_voxel = Color(200,200,100)
+        # One draw function per voxel style
+        def draw_floor_tiles(Ts, Ls, Rs):
+            draw_polygon(surf, color_voxel_top_floor, Ts)
+            draw_polygon(surf, color_voxel_left_floor, Ls)
+            draw_polygon(surf, color_voxel_right_floor, Rs)
+        def draw_shade_faces_solid_color(Ts, Ls, Rs):
+            # Render the three visible quads
+            ### polygon(surface, color, points) -> Rect
+            draw_polygon(surf, color_voxel_top, Ts)
+            draw_polygon(surf, color_voxel_left, Ls)
+            draw_line(surf, color_voxel_left_shadow, Ls[0], Ls[1],width=3)
+            draw_polygon(surf, color_voxel_right, Rs)
+            draw_line(surf, color_voxel_right_shadow, Rs[0], Rs[1],width=3)
+        def draw_skeleton_frame(Ts, Ls, Rs):
+            ### polygon(surface, color, points, width=0) -> Rect
+            draw_polygon(surf, color_voxel_top, Ts, width=1)
+            draw_polygon(surf, color_voxel_left, Ls, width=1)
+            draw_polygon(surf, color_voxel_right, Rs, width=1)
+        draw_style = {
+                "style_floor_tiles":             draw_floor_tiles,
+                "style_shade_faces_solid_color": draw_shade_faces_solid_color,
+                "style_skeleton_frame":          draw_skeleton_frame,
+                }
+        # Lock the surface once for all the voxel, player, and highlight draws
+        # (everything drawn below is pygame.draw -- no blits -- so the lock can stay on)
+        surf.lock()
         voxel_index = 0 # draw_index
         for G in grid_list:
             if G in voxels:
                 ### Draw voxel
-                # Convert the base quad grid points (see make_voxels_from_tile_map) to pixel points
-                #
-                # grid_points -- list of four grid coordinates
-                #     The intent is these coordinates are the vertices of a rectangular
-                #     grid tile. The four coordinates are listed going clockwise around
-                #     the rectangle starting at the "lower left" of the rectangle.
-                #
-                # Xfm the four grid points to pixel space
-                _Ps = [self.game.grid.xfm_gp(grid_point) for grid_point in voxels[G]['grid_points']]
-                # Adjust the z-location of these four points
-                z = voxels[G]['z']
-                Ps = [(P[0],P[1] - z*self.game.grid.scale) for P in _Ps]
-                # Describe the three visible surfaces of the voxel as quads
-                ### T: Top, L: Left, R: Right
-                height = voxels[G]['height']
-                voxel_Ts = [(P[0],P[1] - height*self.game.grid.scale) for P in Ps]
-                voxel_Ls = [Ps[0], Ps[1], voxel_Ts[1], voxel_Ts[0]]
-                voxel_Rs = [Ps[1], Ps[2], voxel_Ts[2], voxel_Ts[1]]
-                style = voxels[G]['style']
-                match style:
-                    case "style_floor_tiles":
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_top_floor'], voxel_Ts)
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_left_floor'], voxel_Ls)
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_right_floor'], voxel_Rs)
-                    case "style_shade_faces_solid_color":
-                        # Render the three visible quads
-                        ### polygon(surface, color, points) -> Rect
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_top'], voxel_Ts)
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_left'], voxel_Ls)
-                        pygame.draw.line(surf, self.game.colors['color_voxel_left_shadow'], voxel_Ls[0], voxel_Ls[1],width=3)
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_right'], voxel_Rs)
-                        pygame.draw.line(surf, self.game.colors['color_voxel_right_shadow'], voxel_Rs[0], voxel_Rs[1],width=3)
-                    case "style_skeleton_frame":
-                        ### polygon(surface, color, points, width=0) -> Rect
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_top'], voxel_Ts, width=1)
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_left'], voxel_Ls, width=1)
-                        pygame.draw.polygon(surf, self.game.colors['color_voxel_right'], voxel_Rs, width=1)
-                    case _:
-                        pass
-                # Check if mouse is at this voxel
-                if G == mouse:
-                    # Draw mouse location highlighting the top of the voxel
-                    pygame.draw.polygon(surf, Color(200,200,100), voxel_Ts)
-                    points_z = [(P[0], P[1] - z*self.game.grid.scale) for P in _Ps]
-                    # Draw a yellow highlight on the top and bottom faces of the voxel
-                    pygame.draw.polygon(surf, Color(200,200,100), points_z, width=3)
+                # If the voxel is off the surface, do not draw it, but still count it
+                # (player and mouse draw order depends on voxel_index)
+                if G in visible:
+                    # Pixel quads come from the cache (see pixel_cache)
+                    Ps, voxel_Ts, voxel_Ls, voxel_Rs, style = visible[G]
+                    # Unknown styles are not drawn
+                    draw_voxel = draw_style.get(style)
+                    if draw_voxel: draw_voxel(voxel_Ts, voxel_Ls, voxel_Rs)
+                    # Check if mouse is at this voxel
+                    if G == mouse:
+                        # Draw mouse location highlighting the top of the voxel
+                        draw_polygon(surf, color_mouse_voxel, voxel_Ts)
+                        # Draw a yellow highlight on the top and bottom faces of the voxel
+                        draw_polygon(surf, color_mouse_voxel, Ps, width=3)
                 # Increment voxel index at the end of the loop (not the beginning)!
                 #   THIS FIXES YET ANOTHER ARTIFACT WHERE PLAYER IS BEHIND A VOXEL
                 voxel_index += 1
@@ -1023,9 +1088,11 @@ class VoxelArtwork:
                     # Draw player
                     player.render(surf)
                     player_is_rendered = True
-            # Draw front part of mouse green highlight in front of player if they are at the same index
-            if (mouse[0] >= round(player.pos[0])) and (mouse[1] <= round(player.pos[1])):
-                self.game.render_grid_tile_highlighted_at_mouse_around_player()
+        # Draw front part of mouse green highlight in front of player if they are at the same index
+        # (this does not depend on G: drawing it once after the loop gives the
+        # same frame as drawing it after every grid position)
+        if (mouse[0] >= round(player.pos[0])) and (mouse[1] <= round(player.pos[1])):
+            self.game.render_grid_tile_highlighted_at_mouse_around_player()
         # DEBUG
         ### DebugHud.add_text(debug_text:str)
         if self.game.debug_hud:
@@ -1046,6 +1113,7 @@ class VoxelArtwork:
                 # Draw the player now
                 player.render(surf)
                 player_is_rendered = True
+        surf.unlock()
 
     def old_render(self, surf) -> None:
         """Render voxels and player.
@@ -1191,18 +1259,15 @@ class RomanizedChars:
             # Create a dictionary: key = letter name, value = letter index
             ### {'f': 0, 'k': 1, 'u': 2, 't': 3, ...}
             self.letters[letter_tag['name']]=letter_tag['from']
-        logger.debug(f"{self.letters}")
+        logger.debug("%s", self.letters)
 
 class Game:
     def __init__(self):
         pygame.init()                                   # Init pygame -- quit in shutdown
         pygame.font.init()                              # Initialize the font module
 
-        os.environ["PYGAME_BLEND_ALPHA_SDL2"] = "1"     # Use SDL2 alpha blending
-        # os.environ["SDL_VIDEO_WINDOW_POS"] = "1000,0"   # Position window in upper right
-
         self.os_window = OsWindow((120*16, 120*9), is_fullscreen=True) # Track OS Window size
-        logger.debug(f"Window size: {self.os_window.size[0]} x {self.os_window.size[1]}")
+        logger.debug("Window size: %d x %d", *self.os_window.size)
 
         self.surfs = define_surfaces(self.os_window)    # Dict of Pygame Surfaces (including pygame.display)
         pygame.display.set_caption("Isometric grid test")
@@ -1211,6 +1276,74 @@ class Game:
         self.keys = define_held_keys()                  # Dict of which keyboard inputs are being held down
         self.settings = define_settings()               # Dict of settings
         pygame.mouse.set_visible(False)                 # Hide the OS mouse icon
+        self.is_visible = True                          # False while OS window is hidden/minimized
+        self.surf_mouse_circle = None                   # Cached in render_mouse_location_as_white_circle()
+
+        # Dict of keys that adjust the xfm: {key: (held key with Shift, held key without Shift)}
+        # (a,b,c,d are repurposed for movement)
+        self.xfm_keys = {
+                pygame.K_e: ('key_E', 'key_e'),
+                pygame.K_f: ('key_F', 'key_f'),
+                }
+
+        # Dict of names of keys that have no unicode representation
+        self.key_names = {
+                pygame.K_RETURN: "Return",
+                pygame.K_ESCAPE: "Esc",
+                pygame.K_BACKSPACE: "Backspace",
+                pygame.K_DELETE: "Delete",
+                pygame.K_F3: "F3",
+                pygame.K_F4: "F4",
+                pygame.K_F5: "F5",
+                pygame.K_F6: "F6",
+                pygame.K_F7: "F7",
+                pygame.K_F8: "F8",
+                pygame.K_F9: "F9",
+                pygame.K_F10: "F10",
+                pygame.K_F12: "F12",
+                pygame.K_LSHIFT: "Left Shift",
+                pygame.K_RSHIFT: "Right Shift",
+                pygame.K_LALT: "Left Alt",
+                pygame.K_RALT: "Right Alt",
+                pygame.K_LCTRL: "Left Ctrl",
+                pygame.K_RCTRL: "Right Ctrl",
+                }
+
+        # Dict of event handlers (None: ignore the event)
+        # Look up the handler instead of matching every event type in turn.
+        self.event_handlers = {
+                # No use for these events yet
+                pygame.AUDIODEVICEADDED: None,
+                pygame.ACTIVEEVENT: None,
+                pygame.MOUSEMOTION: None,
+                pygame.WINDOWENTER: None,
+                pygame.WINDOWLEAVE: None,
+                pygame.WINDOWEXPOSED: None,
+                pygame.VIDEOEXPOSE: None,
+                pygame.WINDOWMOVED: None,
+                pygame.WINDOWFOCUSGAINED: None,
+                pygame.WINDOWTAKEFOCUS: None,
+                pygame.TEXTINPUT: None,                 # Dropped, but NOT blocked (see below)
+                # Handle these events
+                pygame.QUIT: self.handle_quit,
+                pygame.WINDOWRESIZED: self.os_window.handle_WINDOWRESIZED,
+                pygame.KEYDOWN: self.handle_keydown,
+                pygame.KEYUP: self.handle_keyup,
+                pygame.MOUSEWHEEL: self.handle_mousewheel,
+                pygame.MOUSEBUTTONDOWN: self.handle_mousebuttondown,
+                pygame.MOUSEBUTTONUP: self.handle_mousebuttonup,
+                pygame.WINDOWHIDDEN: self.handle_window_hidden,
+                pygame.WINDOWMINIMIZED: self.handle_window_hidden,
+                pygame.WINDOWSHOWN: self.handle_window_shown,
+                pygame.WINDOWRESTORED: self.handle_window_shown,
+                }
+        # Block the ignored events so SDL drops them before they reach the queue
+        # (mouse position comes from pygame.mouse.get_pos(), not MOUSEMOTION)
+        # Do not block TEXTINPUT: SDL stops making text events, and then pygame
+        # fills KEYDOWN.unicode from the keysym (Shift+; gives ';' not ':', no
+        # dead keys, wrong chars on non-US layouts) -- spell casting needs it.
+        pygame.event.set_blocked([event_type for event_type, handler in self.event_handlers.items()
+                                  if (handler is None) and (event_type != pygame.TEXTINPUT)])
 
         # Game Data
         self.grid = Grid(self, N=50)
@@ -1220,18 +1353,38 @@ class Game:
         self.max_fall_speed = 15.0
         self.player = Player(self)
         self.romanized_chars = RomanizedChars(self)
-        self.mouses = {'mouse_height': 0, 'mouse_z':0}
+        self.mouses = {'mouse_height': 0, 'mouse_z':0, 'mouse_pos_p':(0,0), 'mouse_pos_g':(0,0)}
 
         # FPS
         self.clock = pygame.time.Clock()
 
+        # Create the debug HUD once -- game_loop() clears it each frame
+        self._debug_hud = DebugHud(self)
+        self.debug_hud = None                           # None when debug is off
+
+        # Create the help HUD once -- game_loop() clears it each frame
+        self.help_hud = HelpHud(self)
+
+        # Create the spellcasting keystrokes text once -- see render_debug_keystrokes()
+        self.keystrokes_text = Text((0,0), font_size=20, sys_font="Roboto Mono")
+
     def run(self):
         while True: self.game_loop()
 
     def game_loop(self):
-        # Create the debug HUD
+        # Skip the frame while the OS window is hidden -- just wait for it to come back
+        if not self.is_visible:
+            self.handle_ui_events()
+            pygame.time.wait(100)
+            return
+
+        # Read the mouse position once per frame
+        self.mouses['mouse_pos_p'] = pygame.mouse.get_pos()
+
+        # Start a fresh frame of the debug HUD
         if self.settings['setting_debug']:
-            self.debug_hud = DebugHud(self)
+            self.debug_hud = self._debug_hud
+            self.debug_hud.clear()
             self.add_debug_text()
         else:
             self.debug_hud = None
@@ -1245,9 +1398,11 @@ class Game:
         # Pan by pressing the mouse wheel or left-clicking
         self.handle_ui_events()
         if self.grid.is_panning:
-            self.grid.pan(pygame.mouse.get_pos())
+            self.grid.pan(self.mouses['mouse_pos_p'])
 
         self.update_held_keys_effects()
+        # Mouse in grid coord sys, once the xfm is settled for this frame
+        self.mouses['mouse_pos_g'] = self.grid.xfm_pg(self.mouses['mouse_pos_p'])
         # self.update_player_actions()
         self.player.update_actions()
         self.player.update_movement()
@@ -1299,10 +1454,7 @@ class Game:
         # self.surfs['surf_game_art'].blit(self.surfs['surf_alpha'], (0,0), special_flags=pygame.BLEND_ALPHA_SDL2)
         # self.surfs['surf_alpha'].fill(self.colors['color_clear'])
 
-        # Copy game art to OS window
-        ### blit(source, dest, area=None, special_flags=0) -> Rect
-        self.surfs['surf_os_window'].blit(self.surfs['surf_game_art'], (0,0))
-
+        # Game art is drawn directly on the OS window (see define_surfaces)
 
         # Display Debug HUD overlay
         if self.debug_hud:
@@ -1310,7 +1462,7 @@ class Game:
 
         # Display HELP below DEBUG
         if self.settings['setting_show_help']:
-            self.help_hud = HelpHud(self)
+            self.help_hud.clear()
             self.help_hud.add_text("View:")
             self.help_hud.add_text("  - Roll mouse wheel: zoom")
             self.help_hud.add_text("  - Click wheel and drag: pan")
@@ -1335,16 +1487,20 @@ class Game:
             if self.debug_hud:
                 # Bump HelpHud down below the DebugHUD
                 self.help_hud.text.pos = (0,len(self.debug_hud.text.text_lines)*self.debug_hud.text.font.get_linesize())
+            else:
+                self.help_hud.text.pos = (0,0)
             self.help_hud.render(self.colors['color_help_hud'])
 
         # Draw to the OS window
-        pygame.display.update()
+        # The whole window changes every frame (the player wiggles), so dirty
+        # rects would cover the screen anyway: flip the entire display.
+        pygame.display.flip()
 
         ### clock.tick(framerate=0) -> milliseconds
         self.clock.tick(60)
 
     def add_debug_text(self) -> None:
-        mpos_p = pygame.mouse.get_pos()                   # Mouse in pixel coord sys
+        mpos_p = self.mouses['mouse_pos_p']               # Mouse in pixel coord sys
         mpos_g = self.grid.xfm_pg(mpos_p)
         # Display mouse coordinates in game grid coordinate system
         self.debug_hud.add_text(f"Mouse (grid): {mpos_g}")
@@ -1390,71 +1546,72 @@ class Game:
 
 
     def handle_ui_events(self) -> None:
-        kmod = pygame.key.get_mods()                    # Which modifier keys are held
         for event in pygame.event.get():
-            match event.type:
-                # No use for these events yet
-                case pygame.AUDIODEVICEADDED: pass
-                case pygame.ACTIVEEVENT: pass
-                case pygame.MOUSEMOTION: pass
-                case pygame.WINDOWENTER: pass
-                case pygame.WINDOWLEAVE: pass
-                case pygame.WINDOWEXPOSED: pass
-                case pygame.VIDEOEXPOSE: pass
-                case pygame.WINDOWHIDDEN: pass
-                case pygame.WINDOWMOVED: pass
-                case pygame.WINDOWSHOWN: pass
-                case pygame.WINDOWFOCUSGAINED: pass
-                case pygame.WINDOWTAKEFOCUS: pass
-                case pygame.TEXTINPUT: pass
-                # Handle these events
-                case pygame.QUIT: sys.exit()
-                case pygame.WINDOWRESIZED: self.os_window.handle_WINDOWRESIZED(event)
-                case pygame.KEYDOWN: self.handle_keydown(event)
-                case pygame.KEYUP: self.handle_keyup(event)
-                case pygame.MOUSEWHEEL:
-                    # logger.debug(event)
-                    ### {'flipped': False, 'x': 0, 'y': 1, 'precise_x': 0.0, 'precise_y': 1.0, 'touch': False, 'window': None}
-                    match event.y:
-                        case 1: self.grid.zoom_in()
-                        case -1: self.grid.zoom_out()
-                        case _: pass
-                case pygame.MOUSEBUTTONDOWN:
-                    ### L-click: {'pos': (328, 320), 'button': 1, 'touch': False, 'window': None}
-                    ### M-click: {'pos': (328, 320), 'button': 2, 'touch': False, 'window': None}
-                    ### R-click: {'pos': (329, 320), 'button': 3, 'touch': False, 'window': None}
-                    match event.button:
-                        case 1:
-                            logger.debug("Left-click")
-                            if kmod & pygame.KMOD_SHIFT:
-                                # Let shift_left-click be my panning
-                                # because I cannot do right-click-and-drag on the laptop trackpad
-                                self.handle_mousebuttondown_middleclick()
-                            else:
-                                # Place the player
-                                self.handle_mousebuttondown_leftclick(event)
-                        case 2:
-                            logger.debug("Middle-click")
-                            self.handle_mousebuttondown_middleclick()
-                        case 3: logger.debug("Right-click")
-                        case 4: logger.debug("Mousewheel y=+1")
-                        case 5: logger.debug("Mousewheel y=-1")
-                        case 6: logger.debug("Logitech G602 Thumb button 6")
-                        case 7: logger.debug("Logitech G602 Thumb button 7")
-                        case _: logger.debug(event)
-                case pygame.MOUSEBUTTONUP:
-                    match event.button:
-                        case 1:
-                            if kmod & pygame.KMOD_SHIFT:
-                                logger.debug("Shift+Left mouse button released")
-                                self.handle_mousebuttonup_middleclick()
-                        case 2:
-                            logger.debug("Middle mouse button released")
-                            self.handle_mousebuttonup_middleclick()
-                        case _: logger.debug(event)
-                # Log any other events
-                case _:
-                    logger.debug(f"Ignored event: {pygame.event.event_name(event.type)}")
+            # Events not in self.event_handlers go to handle_other_event()
+            handler = self.event_handlers.get(event.type, self.handle_other_event)
+            if handler: handler(event)
+
+    def handle_quit(self, event) -> None:
+        sys.exit()
+
+    def handle_window_hidden(self, event) -> None:
+        logger.debug("Window hidden: stop rendering")
+        self.is_visible = False
+
+    def handle_window_shown(self, event) -> None:
+        logger.debug("Window shown: resume rendering")
+        self.is_visible = True
+
+    def handle_other_event(self, event) -> None:
+        """Log any other events"""
+        # Skip looking up the event name if debug logging is off
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ignored event: %s", pygame.event.event_name(event.type))
+
+    def handle_mousewheel(self, event) -> None:
+        # logger.debug(event)
+        ### {'flipped': False, 'x': 0, 'y': 1, 'precise_x': 0.0, 'precise_y': 1.0, 'touch': False, 'window': None}
+        match event.y:
+            case 1: self.grid.zoom_in()
+            case -1: self.grid.zoom_out()
+            case _: pass
+
+    def handle_mousebuttondown(self, event) -> None:
+        ### L-click: {'pos': (328, 320), 'button': 1, 'touch': False, 'window': None}
+        ### M-click: {'pos': (328, 320), 'button': 2, 'touch': False, 'window': None}
+        ### R-click: {'pos': (329, 320), 'button': 3, 'touch': False, 'window': None}
+        kmod = pygame.key.get_mods()                    # Which modifier keys are held
+        match event.button:
+            case 1:
+                logger.debug("Left-click")
+                if kmod & pygame.KMOD_SHIFT:
+                    # Let shift_left-click be my panning
+                    # because I cannot do right-click-and-drag on the laptop trackpad
+                    self.handle_mousebuttondown_middleclick()
+                else:
+                    # Place the player
+                    self.handle_mousebuttondown_leftclick(event)
+            case 2:
+                logger.debug("Middle-click")
+                self.handle_mousebuttondown_middleclick()
+            case 3: logger.debug("Right-click")
+            case 4: logger.debug("Mousewheel y=+1")
+            case 5: logger.debug("Mousewheel y=-1")
+            case 6: logger.debug("Logitech G602 Thumb button 6")
+            case 7: logger.debug("Logitech G602 Thumb button 7")
+            case _: logger.debug(event)
+
+    def handle_mousebuttonup(self, event) -> None:
+        kmod = pygame.key.get_mods()                    # Which modifier keys are held
+        match event.button:
+            case 1:
+                if kmod & pygame.KMOD_SHIFT:
+                    logger.debug("Shift+Left mouse button released")
+                    self.handle_mousebuttonup_middleclick()
+            case 2:
+                logger.debug("Middle mouse button released")
+                self.handle_mousebuttonup_middleclick()
+            case _: logger.debug(event)
 
     def handle_mousebuttondown_leftclick(self, event) -> None:
         """Place the player"""
@@ -1465,7 +1622,7 @@ class Game:
         self.player.is_on_tile = True
 
     def handle_mousebuttondown_middleclick(self) -> None:
-        self.grid.pan_ref = pygame.mouse.get_pos()
+        self.grid.pan_ref = self.mouses['mouse_pos_p']
         self.grid.is_panning = True
 
     def handle_mousebuttonup_middleclick(self) -> None:
@@ -1532,17 +1689,11 @@ class Game:
         match event.key:
 
             case pygame.K_LSHIFT:
-                self.keys['key_Shift_Space'] = False
-                # self.keys['key_A'] = False
-                # self.keys['key_B'] = False
-                # self.keys['key_C'] = False
-                # self.keys['key_D'] = False
-                self.keys['key_E'] = False
-                self.keys['key_F'] = False
+                for key_upper, _ in self.xfm_keys.values():
+                    self.keys[key_upper] = False
 
             case pygame.K_SPACE:
                 self.keys['key_Space'] = False
-                self.keys['key_Shift_Space'] = False
 
             # case pygame.K_a:
             #     self.keys['key_A'] = False
@@ -1557,13 +1708,10 @@ class Game:
             #     self.keys['key_D'] = False
             #     self.keys['key_d'] = False
 
-            case pygame.K_e:
-                self.keys['key_E'] = False
-                self.keys['key_e'] = False
-
-            case pygame.K_f:
-                self.keys['key_F'] = False
-                self.keys['key_f'] = False
+            case pygame.K_e | pygame.K_f:
+                key_upper, key_lower = self.xfm_keys[event.key]
+                self.keys[key_upper] = False
+                self.keys[key_lower] = False
 
             case _:
                 pass
@@ -1615,7 +1763,7 @@ class Game:
                     self.player.keystrokes += event.unicode
             case _:
                 self.player.keystrokes += event.unicode            # Append key-stroke
-                logger.debug(f"self.player.keystrokes: {self.player.keystrokes}")
+                logger.debug("self.player.keystrokes: %s", self.player.keystrokes)
 
     def handle_keydown_single_shot(self, event) -> None:
         kmod = pygame.key.get_mods()                    # Which modifier keys are held
@@ -1685,31 +1833,13 @@ class Game:
                     # Go back to the tile you were on when you started moving left
                     start = self.player.pos_start
                     self.player.pos_start = (start[0]-1,start[1])
-            # TEMPORARY: Print name of keys that have no unicode representation.
-            case pygame.K_RETURN: logger.debug("Return")
-            case pygame.K_ESCAPE: logger.debug("Esc")
-            case pygame.K_BACKSPACE: logger.debug("Backspace")
-            case pygame.K_DELETE: logger.debug("Delete")
-            case pygame.K_F3: logger.debug("F3")
-            case pygame.K_F4: logger.debug("F4")
-            case pygame.K_F5: logger.debug("F5")
-            case pygame.K_F6: logger.debug("F6")
-            case pygame.K_F7: logger.debug("F7")
-            case pygame.K_F8: logger.debug("F8")
-            case pygame.K_F9: logger.debug("F9")
-            case pygame.K_F10: logger.debug("F10")
-            case pygame.K_F12: logger.debug("F12")
-            case pygame.K_LSHIFT: logger.debug("Left Shift")
-            case pygame.K_RSHIFT: logger.debug("Right Shift")
-            case pygame.K_LALT: logger.debug("Left Alt")
-            case pygame.K_RALT: logger.debug("Right Alt")
-            case pygame.K_LCTRL: logger.debug("Left Ctrl")
-            case pygame.K_RCTRL: logger.debug("Right Ctrl")
             case _:
-                # Print unicode for the pressed key or key combo:
+                # TEMPORARY: Print name of keys that have no unicode representation.
+                # Otherwise print unicode for the pressed key or key combo:
                 #       'A' prints "a"        '1' prints "1"
                 # 'Shift+A' prints "A"  'Shift+1' prints "!"
-                logger.debug(f"{event.unicode}")
+                # (%-style args: the message is only built if debug logging is on)
+                logger.debug("%s", self.key_names.get(event.key, event.unicode))
 
     def handle_keydown_held_keys(self, event) -> None:
         kmod = pygame.key.get_mods()                    # Which modifier keys are held
@@ -1717,7 +1847,9 @@ class Game:
             case pygame.K_SPACE:
                 if kmod & pygame.KMOD_SHIFT:
                     # TEMPORARY randomize voxel artwork
-                    self.keys['key_Shift_Space'] = True
+                    # (once per key press: making the voxels is too slow to do every frame)
+                    # self.voxel_artwork.layout = self.voxel_artwork.make_random_layout()
+                    self.voxel_artwork.layout = self.voxel_artwork.make_voxels_from_tile_map()
                 else:
                     # TEMPORARY levitate player
                     self.keys['key_Space'] = True
@@ -1742,16 +1874,13 @@ class Game:
             #         self.keys['key_D'] = True
             #     else:
             #         self.keys['key_d'] = True
-            case pygame.K_e:
+            case pygame.K_e | pygame.K_f:
+                # Look up (Shift, no Shift) held keys for this xfm key
+                key_upper, key_lower = self.xfm_keys[event.key]
                 if kmod & pygame.KMOD_SHIFT:
-                    self.keys['key_E'] = True
+                    self.keys[key_upper] = True
                 else:
-                    self.keys['key_e'] = True
-            case pygame.K_f:
-                if kmod & pygame.KMOD_SHIFT:
-                    self.keys['key_F'] = True
-                else:
-                    self.keys['key_f'] = True
+                    self.keys[key_lower] = True
 
             # Free player movement
 
@@ -1824,11 +1953,6 @@ class Game:
         # Pick what action to do when Space is held
         self.player.actions['action_levitate'] = self.keys['key_Space']
 
-        # Randomize voxel artwork if Shift+Space is held
-        if self.keys['key_Shift_Space']:
-            # self.voxel_artwork.layout = self.voxel_artwork.make_random_layout()
-            self.voxel_artwork.layout = self.voxel_artwork.make_voxels_from_tile_map()
-
     def update_held_keys_effects_grid_xfm(self) -> None:
         # Update transform based on key presses
         # U = 20; L = -20                                 # Upper/Lower bounds
@@ -1841,29 +1965,26 @@ class Game:
         # if self.keys['key_c']: self.grid.c = max(L, self.grid.c-1)
         # if self.keys['key_d']: self.grid.d = max(L, self.grid.d-1)
         # Update transform based on key presses
-        if self.keys['key_A']: self.grid.a += 1
-        if self.keys['key_B']: self.grid.b += 1
-        if self.keys['key_C']: self.grid.c += 1
-        if self.keys['key_D']: self.grid.d += 1
-        # if self.keys['key_a']: self.grid.a -= 1
-        if self.keys['key_b']: self.grid.b -= 1
-        if self.keys['key_c']: self.grid.c -= 1
-        # if self.keys['key_d']: self.grid.d -= 1
-        if self.keys['key_E']: self.grid.e += 1
-        if self.keys['key_e']: self.grid.e -= 1
-        if self.keys['key_F']: self.grid.f += 1
-        if self.keys['key_f']: self.grid.f -= 1
+        # (only e,f are held keys -- a,b,c,d are not handled in handle_keydown_held_keys)
+        keys = self.keys
+        if keys['key_E']: self.grid.e += 1
+        if keys['key_e']: self.grid.e -= 1
+        if keys['key_F']: self.grid.f += 1
+        if keys['key_f']: self.grid.f -= 1
+        # Update the cached xfm (does nothing if no keys are held)
+        self.grid.update_xfm()
 
     def update_held_keys_effects_player_movement(self) -> None:
         # Free player movement
-        self.player.moves['move_down']  = self.keys['key_s']
-        self.player.moves['move_up']    = self.keys['key_w']
-        self.player.moves['move_left']  = self.keys['key_a']
-        self.player.moves['move_right'] = self.keys['key_d']
+        keys = self.keys; moves = self.player.moves
+        moves['move_down']  = keys['key_s']
+        moves['move_up']    = keys['key_w']
+        moves['move_left']  = keys['key_a']
+        moves['move_right'] = keys['key_d']
 
     def update_mouse_height(self) -> None:
         """Mouse height is the top of the voxel where the mouse is hovering."""
-        G = self.grid.xfm_pg(pygame.mouse.get_pos())
+        G = self.mouses['mouse_pos_g']
         voxels = self.voxel_artwork.layout
         h = 0; z = 0
         if G in voxels:
@@ -1878,35 +1999,38 @@ class Game:
     # NOT USED
     def render_mouse_location_as_white_circle(self) -> None:
         """Display mouse location with a white, transparent, hollow circle."""
-        mpos_p = pygame.mouse.get_pos()                   # Mouse in pixel coord sys
-        radius=10
-        ### Surface((width, height), flags=0, Surface) -> Surface
-        surf = pygame.Surface((2*radius,2*radius), flags=pygame.SRCALPHA)
-        ### circle(surface, color, center, radius, width=0) -> Rect
-        pygame.draw.circle(surf, Color(255,255,255,100), (radius,radius), radius, width=2)
-        self.surfs['surf_game_art'].blit(surf, mpos_p, special_flags=pygame.BLEND_ALPHA_SDL2)
+        mpos_p = self.mouses['mouse_pos_p']               # Mouse in pixel coord sys
+        # Draw the circle once, then reuse it every frame
+        if self.surf_mouse_circle is None:
+            radius=10
+            ### Surface((width, height), flags=0, Surface) -> Surface
+            surf = pygame.Surface((2*radius,2*radius), flags=pygame.SRCALPHA).convert_alpha()
+            ### circle(surface, color, center, radius, width=0) -> Rect
+            pygame.draw.circle(surf, Color(255,255,255,100), (radius,radius), radius, width=2)
+            self.surf_mouse_circle = surf
+        self.surfs['surf_game_art'].blit(self.surf_mouse_circle, mpos_p, special_flags=pygame.BLEND_ALPHA_SDL2)
 
     # TODO: move this into VoxelArtwork
     # Called in VoxelArtwork.render()
     def render_grid_tile_highlighted_at_mouse(self) -> None:
         """Display mouse location by highlighting the grid square the mouse is hovering over."""
-        G = self.grid.xfm_pg(pygame.mouse.get_pos())
+        G = self.mouses['mouse_pos_g']
         Gs = [ # Define a square tile on the grid
                 (G[0]  ,G[1]  ),
                 (G[0]+1,G[1]  ),
                 (G[0]+1,G[1]+1),
                 (G[0]  ,G[1]+1)]
-        points = [self.grid.xfm_gp(G) for G in Gs]
+        points = self.grid.xfm_gp_points(Gs)
         pygame.draw.polygon(self.surfs['surf_game_art'], Color(100,255,100), points, width=5)
 
     def render_grid_tile_highlighted_at_mouse_around_player(self) -> None:
         """Render just the front of the highlight around the player when mouse is on player's tile."""
-        G = self.grid.xfm_pg(pygame.mouse.get_pos())
+        G = self.mouses['mouse_pos_g']
         Gs = [ # Define only the front part of the square tile on the grid
                 (G[0]  ,G[1]  ),
                 (G[0]+1,G[1]  ),
                 (G[0]+1,G[1]+1)]
-        points = [self.grid.xfm_gp(G) for G in Gs]
+        points = self.grid.xfm_gp_points(Gs)
         pygame.draw.lines(self.surfs['surf_game_art'], Color(100,255,100), False, points, width=5)
 
     def render_vertical_line_on_grid(self, start:tuple, height:int=10) -> None:
@@ -1914,27 +2038,10 @@ class Game:
         l = LineSeg(start=P, end=(P[0],P[1]-(height*self.grid.scale)))
         pygame.draw.line(self.surfs['surf_game_art'], self.colors['color_vertical_lines'], l.start, l.end)
 
-    def render_voxel_on_grid(self, grid_points:list, height:int=10) -> None:
-        """
-        :param grid_points:list -- list of four grid coordinates
-            The intent is these coordinates are the vertices of a rectangular
-            grid tile. The four coordinates are listed going clockwise around
-            the rectangle starting at the "lower left" of the rectangle.
-        """
-        Gs = grid_points
-        Ps = [self.grid.xfm_gp(G) for G in grid_points]
-        ### T: Top, L: Left, R: Right
-        voxel_Ts = [(P[0],P[1] - height*self.grid.scale) for P in Ps]
-        voxel_Ls = [Ps[0], Ps[1], voxel_Ts[1], voxel_Ts[0]]
-        voxel_Rs = [Ps[1], Ps[2], voxel_Ts[2], voxel_Ts[1]]
-        pygame.draw.polygon(self.surfs['surf_game_art'], self.colors['color_voxel_top'], voxel_Ts)
-        pygame.draw.polygon(self.surfs['surf_game_art'], self.colors['color_voxel_left'], voxel_Ls)
-        pygame.draw.polygon(self.surfs['surf_game_art'], self.colors['color_voxel_right'], voxel_Rs)
-
     def render_debug_keystrokes(self, surf:pygame.Surface) -> None:
         """Show keystrokes in debug font at bottom of screen"""
-        # Render keystrokes
-        keystrokes = Text((0,0), font_size=20, sys_font="Roboto Mono")
+        # Render keystrokes (Text is created once in __init__)
+        keystrokes = self.keystrokes_text
         ### pygame.Surface.get_height() -> height
         ### pygame.font.Font.get_height() -> int
         keystrokes.pos = (surf.get_width()/2, surf.get_height() - keystrokes.font.get_height())
@@ -1951,6 +2058,9 @@ class Grid:
         self.game = game                                # The Game
         self.N = N                                      # Number of grid lines
         self.scale = 1.0                                # Zoom scale
+        self.xfm = None                                 # Scaled xfm (a,b,c,d,e,f) -- see update_xfm()
+        self._linesegs = self.hlinesegs + self.vlinesegs # Grid lines (start,end) only change if N changes
+        self._debug_styles = self.debug_styles()        # (color, is_axis) of each grid line in debug
         self.reset()
 
     def reset(self) -> None:
@@ -1976,6 +2086,32 @@ class Grid:
         self.is_panning = False # Tracks whether mouse is panning
 
         self.scale = self.zoom_to_fit()
+        self.update_xfm()
+
+    def update_xfm(self) -> None:
+        """Update the cached xfm after changing a, b, c, d, e, f, or scale.
+
+        Anything that only depends on the xfm is calculated here instead of
+        every frame. Returns early if the xfm did not change, so it is cheap
+        to call every frame.
+        """
+        a,b,c,d = self.scaled()
+        e,f = (self.e, self.f)
+        xfm = (a,b,c,d,e,f)
+        if xfm == self.xfm: return
+        self.xfm = xfm
+        # Determinant of the scaled 2x2 xfm
+        det = a*d-b*c
+        if det == 0:
+            # If det=0, Ainv will have div by 0, so just make det very small.
+            det = 0.0001
+        # Inverse xfm (see "Inverse point transformation" in the README)
+        self.xfm_inv = (d/det, -1*b/det, -1*c/det, a/det, (b*f-d*e)/det, (c*e-a*f)/det)
+        # Transform the end points of every grid line to pixel coordinates in one batch
+        # Store whole pixels (ints) so the draw calls do not convert floats
+        Ps = [(round(x), round(y)) for x,y in
+              self.xfm_gp_points([G for lineseg in self._linesegs for G in lineseg])]
+        self._pixel_segments = list(zip(Ps[0::2], Ps[1::2]))
 
     def zoom_to_fit(self) -> float:
         # Get the size of the grid
@@ -1999,54 +2135,46 @@ class Grid:
     def scaled(self) -> tuple:
         return (self.a*self.scale, self.b*self.scale, self.c*self.scale, self.d*self.scale)
 
-    @property
-    def det(self) -> float:
-        a,b,c,d = self.scaled()
-        det = a*d-b*c
-        if det == 0:
-            # If det=0, Ainv will have div by 0, so just make det very small.
-            return 0.0001
-        else:
-            return a*d-b*c
-
     @property
     def hlinesegs(self) -> list:
-        """Return list of horizontal line segments."""
+        """Return list of horizontal line segments as (start, end) tuples."""
         ### Put origin in bottom left
         # a = 0                                         # Bottom/Left of grid
         # b = self.N                                    # Top/Right of grid
         ### Put origin in center
         a = -1*int(self.N/2)                            # Bottom/Left of grid
         b = int(self.N/2)                               # Top/Right of grid
-        cs = list(range(a,b+1))
-        hls = []
-        for c in cs:
-            hls.append (LineSeg(start=(a,c),end=(b,c)))
-        return hls
+        return [((a,c),(b,c)) for c in range(a,b+1)]
 
     @property
     def vlinesegs(self) -> list:
-        """Return list of vertical line segments."""
+        """Return list of vertical line segments as (start, end) tuples."""
         ### Put origin in bottom left
         # a = 0                                           # Bottom/Left of grid
         # b = self.N                                      # Top/Right of grid
         ### Put origin in center
         a = -1*int(self.N/2)                            # Bottom/Left of grid
         b = int(self.N/2)                               # Top/Right of grid
-        cs = list(range(a,b+1))                         # Intermediate points
-        vls = []
-        for c in cs:
-            vls.append (LineSeg(start=(c,a),end=(c,b)))
-        return vls
+        return [((c,a),(c,b)) for c in range(a,b+1)]
 
     def xfm_gp(self, point:tuple) -> tuple:
         """Transform point from game grid coordinates to OS Window pixel coordinates."""
-        # Define 2x2 transform
-        a,b,c,d = self.scaled()
-        # Define offset vector (in pixel coordinates)
-        e,f = (self.e, self.f)
+        # Scaled 2x2 transform and offset vector are cached in update_xfm()
+        a,b,c,d,e,f = self.xfm
         return (a*point[0] + b*point[1] + e, c*point[0] + d*point[1] + f)
 
+    def xfm_gp_points(self, points:list, dy:float=0) -> list:
+        """Transform a list of points from game grid coordinates to OS Window pixel coordinates.
+
+        Same result as calling xfm_gp() on each point, but the xfm is only
+        looked up once for the whole list.
+
+        :param dy:float -- pixel offset added to every y (e.g., to raise points by z)
+        """
+        a,b,c,d,e,f = self.xfm
+        f += dy
+        return [(a*x + b*y + e, c*x + d*y + f) for x,y in points]
+
     def xfm_pg(self, point:tuple, p:int=0) -> tuple:
         """Transform point from OS Window pixel coordinates to game grid coordinates.
 
@@ -2054,70 +2182,99 @@ class Grid:
         :param p:int -- decimal precision of returned coordinate (default: 0, return ints)
         :return tuple -- (x,y) in grid goordinates
         """
-        # Define 2x2 transform
-        a,b,c,d = self.scaled()
-        # Define offset vector (in pixel coordinates)
-        e,f = (self.e, self.f)
-        # Calculate the determinant of the 2x2
-        det = self.det
-        g = ((   d/det)*point[0] + (-1*b/det)*point[1] + (b*f-d*e)/det,
-             (-1*c/det)*point[0] + (   a/det)*point[1] + (c*e-a*f)/det)
+        # Inverse xfm is cached in update_xfm()
+        a,b,c,d,e,f = self.xfm_inv
+        g = (a*point[0] + b*point[1] + e, c*point[0] + d*point[1] + f)
         # Define precision
         if p==0:
-            return (int(round(g[0])), int(round(g[1])))
+            # Round half up: math.floor() returns an int, no int(round()) needed
+            return (math.floor(g[0] + 0.5), math.floor(g[1] + 0.5))
         else:
             return (round(g[0],p), round(g[1],p))
 
     def zoom_in(self) -> None:
         self.scale *= 1.1
+        self.update_xfm()
 
     def zoom_out(self) -> None:
         self.scale *= 0.9
+        self.update_xfm()
 
     def pan(self, mpos:tuple) -> None:
         self.e = self.pan_origin[0] + (mpos[0] - self.pan_ref[0])
         self.f = self.pan_origin[1] + (mpos[1] - self.pan_ref[1])
+        self.update_xfm()
 
     def draw(self, surf:pygame.Surface) -> None:
-        linesegs = self.hlinesegs + self.vlinesegs
-        for grid_line in linesegs:
-            if self.game.settings['setting_debug']:
-                # Set color to be a gradient from lower left to upper right of blue to red
-                if (grid_line.start[0] == 0) and (grid_line.end[0] == 0):
-                    color = Color(self.game.colors['color_grid_x_axis'])
-                elif (grid_line.start[1] == 0) and (grid_line.end[1] == 0):
-                    color = Color(self.game.colors['color_grid_y_axis'])
-                else:
-                    color = Color(self.game.colors['color_grid_lines'])
-                    if (grid_line.start[0] == grid_line.end[0]):
-                        # Vertical lines get more red from left to right
-                        color.r = min(255, 155 + 2*int(grid_line.start[0]))
-                    elif (grid_line.start[1] == grid_line.end[1]):
-                        # Horizontal lines get more red from top to bottom
-                        color.r = min(255, 155 + 2*int(grid_line.start[1]))
+        """Draw the grid lines onto the surface.
+
+        The lines are drawn straight onto the surface (not cached on a
+        transparent surface) so the anti-aliased lines blend with the
+        artwork underneath them.
+        """
+        self.render_lines(surf)
+
+    def debug_styles(self) -> list:
+        """Return the debug (color, is_axis) of each grid line in self._linesegs.
+
+        Grid lines never change color, so this is only done once (in __init__).
+        """
+        color_x_axis = self.game.colors['color_grid_x_axis']
+        color_y_axis = self.game.colors['color_grid_y_axis']
+        color_grid_lines = self.game.colors['color_grid_lines']
+        styles = []
+        for G_start, G_end in self._linesegs:
+            # Set color to be a gradient from lower left to upper right of blue to red
+            if (G_start[0] == 0) and (G_end[0] == 0):
+                styles.append((color_x_axis, True))
+            elif (G_start[1] == 0) and (G_end[1] == 0):
+                styles.append((color_y_axis, True))
             else:
-                color = Color(self.game.colors['color_grid_lines'])
+                color = Color(color_grid_lines)
+                if (G_start[0] == G_end[0]):
+                    # Vertical lines get more red from left to right
+                    color.r = min(255, 155 + 2*int(G_start[0]))
+                elif (G_start[1] == G_end[1]):
+                    # Horizontal lines get more red from top to bottom
+                    color.r = min(255, 155 + 2*int(G_start[1]))
+                styles.append((color, False))
+        return styles
+
+    def render_lines(self, surf:pygame.Surface) -> None:
+        # Look up the settings and colors once, not once per line
+        is_debug = self.game.settings['setting_debug']
+        color_grid_lines = self.game.colors['color_grid_lines']
+        W,H = surf.get_size()
+        # Lock the surface once for all the lines instead of once per draw call
+        # (the grid lines are not connected, so they cannot go in one draw.lines() call)
+        surf.lock()
+        for (start, end), (color_debug, is_axis) in zip(self._pixel_segments, self._debug_styles):
+            # Skip lines that are entirely off one side of the surface
+            # (1 pixel margin for the thick axis lines)
+            if (((start[0] < -1) and (end[0] < -1)) or ((start[0] > W) and (end[0] > W)) or
+                ((start[1] < -1) and (end[1] < -1)) or ((start[1] > H) and (end[1] > H))):
+                continue
             ### Drawing anti-aliased lines vs not anti-aliased seems to have no effect on framerate.
             ### Not anti-aliased:
             ### line(surface, color, start_pos, end_pos, width=1) -> Rect
-            if self.game.settings['setting_debug']:
+            if is_debug:
+                color = color_debug
                 # Draw x and y axis thicker and a different color from the rest of the grid
-                if ((grid_line.start[0] == 0) and (grid_line.end[0] == 0)) or ((grid_line.start[1] == 0) and (grid_line.end[1] == 0)):
-                    pygame.draw.line( surf, color,
-                            self.xfm_gp(grid_line.start),
-                            self.xfm_gp(grid_line.end),
-                            width=2
-                            )
+                # (only the thick line -- an aaline on top of it would be drawn over)
+                if is_axis:
+                    pygame.draw.line( surf, color, start, end, width=2)
+                    continue
+            else:
+                color = color_grid_lines
             ### Anti-aliased:
             ### aaline(surface, color, start_pos, end_pos, blend=1) -> Rect
             ### Blend is 0 or 1. Both are anti-aliased.
             ### 1: (this is what you want) blend with the surface's existing pixel color
             ### 0: completely overwrite the pixel (as if blending with black)
-            pygame.draw.aaline(surf, color,
-                    self.xfm_gp(grid_line.start),
-                    self.xfm_gp(grid_line.end),
+            pygame.draw.aaline(surf, color, start, end,
                     blend=1                             # 0 or 1
                     )
+        surf.unlock()
 
 if __name__ == '__main__':
     atexit.register(shutdown)                           # Safe shutdown
@@ -7,6 +7,7 @@ import sys
 import logging
 from pathlib import Path
 import os
+import math
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"          # Set pygame env var to hide "Hello" msg
 import pygame
 from pygame import Color
@@ -101,7 +102,7 @@ class OsWindow:
             self._size = self._windowed_size
             self._flags = pygame.RESIZABLE
         # Report new window size
-        logger.debug(f"Window size: {self.size[0]} x {self.size[1]}")
+        logger.debug("Window size: %d x %d", *self.size)
 
     def toggle_fullscreen(self) -> None:
         """Toggle OS window between full screen and windowed.
@@ -120,13 +121,13 @@ class OsWindow:
         logger.debug(f"Fullscreen size: {desktop_sizes[-1]}")
         """
         self._is_fullscreen = not self.is_fullscreen
-        logger.debug(f"FULLSCREEN: {self.is_fullscreen}")
+        logger.debug("FULLSCREEN: %s", self.is_fullscreen)
         self._set_size_and_flags() # Set size and flags based on fullscreen or windowed
 
     def handle_WINDOWRESIZED(self, event) -> None:
         """Track size of OS window in self.size"""
         self.size = (event.x, event.y)
-        logger.debug(f"Window resized, self.size: {self.size}")
+        logger.debug("Window resized, self.size: %s", self.size)
 
 class Text:
     def __init__(self, pos:tuple, font_size:int, sys_font:str):
@@ -164,6 +165,10 @@ class HelpHud:
     def add_text(self, help_text:str):
         self.help_text += f"\n{help_text}"
 
+    def clear(self) -> None:
+        """Remove all help text except the title. Keep the font for the next frame."""
+        self.help_text = "HELP\n----"
+
     def render(self, color) -> None:
         self.text.update(f"{self.help_text}")
         self.text.render(self.game.surfs['surf_os_window'], color)
@@ -185,8 +190,12 @@ class DebugHud:
         """
         self.debug_text += f"\n{debug_text}"
 
+    def clear(self) -> None:
+        """Remove all debug text. Keep the font for the next frame."""
+        self.debug_text = ""
+
     def render(self, color) -> None:
-        mpos = pygame.mouse.get_pos()
+        mpos = self.game.mouses['mouse_pos_p']
         self.text.update(f"FPS: {self.game.clock.get_fps():0.1f} | Mouse: {mpos}"
                          f"{self.debug_text}")
         self.text.render(self.game.surfs['surf_os_window'], color)
@@ -203,12 +212,16 @@ def define_surfaces(os_window:OsWindow) -> dict:
     ### set_mode(size=(0, 0), flags=0, depth=0, display=0, vsync=0) -> Surface
     surfs['surf_os_window'] = pygame.display.set_mode(os_window.size, os_window.flags)
 
-    # Blend artwork on the game art surface.
-    # This is the final surface that is  copied to the OS Window.
-    surfs['surf_game_art'] = pygame.Surface(os_window.size, flags=pygame.SRCALPHA)
+    # Draw artwork on the game art surface.
+    # This IS the OS Window: all game art colors are opaque, so a separate
+    # surface only cost a fill and a full-window copy every frame.
+    # Blend translucent artwork on 'surf_alpha' and blit that onto this.
+    surfs['surf_game_art'] = surfs['surf_os_window']
 
     # Temporary drawing surface -- draw on this, blit the drawn portion, then clear this.
-    surfs['surf_alpha'] = pygame.Surface(surfs['surf_game_art'].get_size(), flags=pygame.SRCALPHA)
+    # Convert to the pixel format of the OS Window so blits take the fast path.
+    # (Converting only works after set_mode().)
+    surfs['surf_alpha'] = pygame.Surface(surfs['surf_game_art'].get_size(), flags=pygame.SRCALPHA).convert_alpha()
 
     # This surface is populated later when Game instantiates RomanizedChars
     surfs['surf_romanized_chars'] = None
@@ -245,16 +258,7 @@ def define_held_keys() -> dict:
     keys = {}
     # Special
     keys['key_Space'] = False
-    keys['key_Shift_Space'] = False
-    # Xfm matrix
-    keys['key_A'] = False
-    # keys['key_a'] = False # Repurposed
-    keys['key_B'] = False
-    keys['key_b'] = False
-    keys['key_C'] = False
-    keys['key_c'] = False
-    keys['key_D'] = False
-    # keys['key_d'] = False # Repurposed
+    # Xfm matrix (a,b,c,d are not held keys: 'a' and 'd' are repurposed for movement)
     keys['key_E'] = False
     keys['key_e'] = False
     keys['key_F'] = False
@@ -291,6 +295,9 @@ def define_colors() -> dict:
     colors['color_voxel_right_floor'] = Color(110,110,230,255)
     colors['color_grid_x_axis']       = Color(100,150,200,255)
     colors['color_grid_y_axis']       = Color(200,100,200,255)
+    player = colors['color_grid_y_axis']
+    colors['color_player_dress']      = Color(player)
+    colors['color_player_dress_dark'] = Color(player.r-50, player.g-50, player.b-50, player.a)
     colors['color_floor_solid']       = Color(70,40,130,200)
     floor = colors['color_floor_solid']
     colors['color_floor_shadow'] = Color(floor.r-20, floor.g-20, floor.b-40)
@@ -306,26 +313,28 @@ def define_settings() -> dict:
 def floor(x:float) -> int:
     """Return x rounded down to an int.
     
-    Rounding down depends on whether x is + or -.
+    Rounds toward -inf for both + and - x (unlike int(), which rounds toward 0).
     >>> floor(-10.8)
     -11
     >>> floor(10.8)
     10
+    >>> floor(-11.0)
+    -11
     """
-    if x < 0: return int(x) - 1
-    else: return int(x)
+    return math.floor(x)
 
 def ceiling(x:float) -> int:
     """Return x rounded up to an int.
     
-    Rounding up depends on whether x is + or -.
+    Rounds toward +inf for both + and - x (unlike int(), which rounds toward 0).
     >>> ceiling(-10.8)
     -10
     >>> ceiling(10.8)
     11
+    >>> ceiling(11.0)
+    11
     """
-    if x < 0: return int(x)
-    else: return int(x) + 1
+    return math.ceil(x)
 
 def add(a,b,p:int=3) -> float:
     """Avoid float issues: Add a+b with precision p.